@@ -18,12 +18,41 @@
 - 結果の詳細分析と表示
 """
 
+import math
+import sys
 import numpy as np
 import pyjson
 
-# Pauli-Xゲート（NOT ゲート）の行列表現
-X = np.array([[0, 1],
-              [1, 0]])
+# Numbaカーネル（未インストールの場合はNumPy実装を使用）
+try:
+    from func_2_numba import _apply_2x2
+except ImportError:
+    _apply_2x2 = None
+
+# CuPy（GPU）による前半処理の探索（未インストール・GPU非搭載の場合はNumPyで実行）
+try:
+    import cupy as cp
+    if cp.cuda.runtime.getDeviceCount() == 0:
+        cp = None
+except ImportError:
+    cp = None
+except Exception:  # CUDAランタイムが利用できない環境
+    cp = None
+
+# 前半処理（全組み合わせ探索）の計算精度
+# 探索は単精度で行い、採用したゲートのみ倍精度で状態ベクトルに適用する
+SEARCH_DTYPE = np.complex64
+DIFF_TOLERANCE = 0.000000000001  # 後半処理で更新とみなす最小の改善幅（数値誤差の許容幅）
+SEARCH_TOLERANCE = 0.00001  # 単精度での誤差比較の許容幅（16量子ビットで丸め誤差は約5e-6）
+SEARCH_BATCH_SIZE = 1 << 22  # 一括評価する状態ベクトル群の最大振幅数（単精度で32MB）
+SEARCH_GPU_MIN_QUBITS = 14  # GPUで探索する最小の量子ビット数（小規模では転送コストが上回る）
+SEARCH_FLUSH = 1e-18  # 探索用状態でゼロとみなす振幅の大きさ（単精度の非正規化数による低速化を防ぐ）
+
+# CNOTゲートの4x4行列表現（上位ビット:制御ビット, 下位ビット:ターゲットビット）
+CNOT = np.array([[1, 0, 0, 0],
+                 [0, 1, 0, 0],
+                 [0, 0, 0, 1],
+                 [0, 0, 1, 0]])
 
 
 def data_read():
@@ -39,9 +68,14 @@ def data_read():
     loaded_data = pyjson.parse_json(json_data)
     
     # 複素数データの復元（JSONは複素数を実部・虚部のペアで保存）
+    # [実部, 虚部] を最終軸に持つ実数配列 [データ数, 2, 2, 2] を complex128 として再解釈
+    float_array = np.ascontiguousarray([data[1] for data in loaded_data], dtype=np.float64)
+    complex_array = float_array.view(np.complex128).reshape(float_array.shape[:-1])
+    complex_array.flags.writeable = False  # 変換処理でコピーせずに共有するため読み取り専用にする
+    # ゲート名は共有の文字列に置き換える（メモリ削減と比較・辞書検索の高速化）
     for i, data in enumerate(loaded_data):
-        loaded_array = np.array([[complex(x[0], x[1]) for x in row] for row in data[1]])
-        loaded_data[i][1] = loaded_array
+        loaded_data[i][0] = [sys.intern(gate) for gate in data[0]]
+        loaded_data[i][1] = complex_array[i]
     
     print(f"最大ゲート数: {len(loaded_data[len(loaded_data)-1][0])}, データ数: {len(loaded_data)}")
     return loaded_data
@@ -74,12 +108,9 @@ def calc_initialize_state(initialize_values):
     Returns:
         numpy.ndarray: 初期状態ベクトル（複素数配列）
     """
-    initialize_state = np.array([1])
+    initialize_state = np.array([1+0j])
     
-    for i, data in enumerate(initialize_values):
-        # 新しい量子ビットを追加するたびに状態空間が倍に
-        new_initialize_state = np.array([0+0j] * (1 << (i+1)))
-        
+    for data in initialize_values:
         # 単一量子ビット状態の計算
         initialize = np.array([1+0j, 0+0j])
         theta1_rad = np.deg2rad(data[1])  # 極角をラジアンに変換
@@ -89,52 +120,37 @@ def calc_initialize_state(initialize_values):
         initialize[0] = np.cos(theta1_rad / 2)
         initialize[1] = np.exp(0+1j*phi1_rad) * np.sin(theta1_rad / 2)
         
-        # テンソル積で状態空間を拡張
-        for j in range(len(new_initialize_state)):
-            new_initialize_state[j] = initialize_state[int(j/2)] * initialize[int(j%2)]
-        
-        initialize_state = new_initialize_state.copy()
+        # テンソル積で状態空間を拡張（量子ビットを追加するたびに状態空間が倍に）
+        initialize_state = np.kron(initialize_state, initialize)
 
     return initialize_state
 
 
-def apply_controlled_gate(state_vector, gate, targetGateVector, numQubit):
+def apply_controlled_gate(state_in, state_out, targetQubit, targetGateVector, numQubit):
     """
-    制御ゲートを状態ベクトルに適用
+    単一量子ビットゲートを状態ベクトルに適用
+    （CNOTゲートは前半処理で4x4行列に融合して apply_2qubit_gate で適用する）
     
     Args:
-        state_vector (numpy.ndarray): 現在の状態ベクトル
-        gate (list): ゲート配置情報 ['c', 'TG', '', ...] 
-                     'c': 制御ビット, 'TG': ターゲットビット, '': 何もしない
+        state_in (numpy.ndarray): 現在の状態ベクトル（書き換えない）
+        state_out (numpy.ndarray): 結果を書き込む状態ベクトル（state_inと同一でも可）
+        targetQubit (int): ターゲット量子ビットのインデックス
         targetGateVector (numpy.ndarray): 適用するゲートの2x2行列
         numQubit (int): 量子ビット数
         
     Returns:
-        numpy.ndarray: ゲート適用後の状態ベクトル
+        numpy.ndarray: ゲート適用後の状態ベクトル（state_out）
     """
-    control = 'c'
-    targetQubit = -1
-    
-    # ターゲット量子ビットを特定
-    for i in range(numQubit):
-        if "TG" == gate[i]:
-            targetQubit = i
-    
-    if targetQubit == -1:
-        return state_vector
+    # 出力先に入力状態を複写し、以降は出力先をインプレースで更新
+    if state_out is not state_in:
+        np.copyto(state_out, state_in)
+    state_vector = state_out
     
-    n = 2**numQubit
-    m = 2**targetQubit
-    s = int(n/m)
-    p = int(s/2)
-    controlState = [1]
-    controlbit = False
-    
-    # 制御ビットの存在確認
-    for i in range(numQubit):
-        if gate[i] == control:
-            controlbit = True
-            break
+    # ブロック数とストライドは整数シフトで計算（浮動小数点を経由しない）
+    n = 1 << numQubit
+    m = 1 << targetQubit  # ターゲットビットより上位のブロック数
+    s = n >> targetQubit  # 1ブロックの大きさ
+    p = s >> 1            # ターゲットビットのストライド
 
     # ゲート行列の要素を取得
     t11 = targetGateVector[1, 1]
@@ -142,48 +158,106 @@ def apply_controlled_gate(state_vector, gate, targetGateVector, numQubit):
     t10 = targetGateVector[1, 0]
     t00 = targetGateVector[0, 0]
 
-    if controlbit == True:
-        # 制御ゲートの場合：制御ビット状態に応じてゲートを適用
-        for i in range(numQubit):
-            if i != targetQubit:
-                oneControlState0 = 1
-                if gate[i] == control:
-                    oneControlState0 = 0  # 制御ビットが|0⟩の場合はゲート適用しない
-                newControlState = [0] * (2*len(controlState))
-                for j in range(len(controlState)):
-                    newControlState[2*j] = controlState[j] * oneControlState0
-                    newControlState[2*j + 1] = controlState[j]
-                controlState = newControlState
-
-        # 制御条件を満たす場合のみゲートを適用
-        for i in range(m):
-            x = i * s
-            ip = i * p
-            
-            for j in range(p):
-                if controlState[ip+j] == 1:
-                    i0 = x + j
-                    i1 = i0 + p
-                    sv0 = state_vector[i0]
-                    sv1 = state_vector[i1]
-                    state_vector[i0] = sv0 * t00 + sv1 * t01
-                    state_vector[i1] = sv0 * t10 + sv1 * t11
+    if _apply_2x2 is not None:
+        # Numbaカーネルで適用
+        _apply_2x2(state_vector, complex(t00), complex(t01), complex(t10), complex(t11), m, p)
+        return state_vector
+
+    # 状態ベクトルを (m, 2, p) に整形（コピーなしのビュー）
+    # sv0 がターゲットビット|0⟩側、sv1 が|1⟩側の振幅
+    sv = state_vector.reshape(m, 2, p)
+    sv0 = sv[:, 0, :]
+    sv1 = sv[:, 1, :]
+
+    a = sv0 * t00 + sv1 * t01
+    b = sv0 * t10 + sv1 * t11
+    sv0[...] = a
+    sv1[...] = b
+
+    return state_vector
+
+
+def apply_2qubit_gate(state_in, state_out, U4, q_high, q_low, numQubit):
+    """
+    2量子ビットゲート（4x4行列）を状態ベクトルに適用
+    
+    Args:
+        state_in (numpy.ndarray): 現在の状態ベクトル（書き換えない）
+        state_out (numpy.ndarray): 結果を書き込む状態ベクトル（state_inとは別の配列）
+        U4 (numpy.ndarray): 適用するゲートの4x4行列
+                            行・列の添字は 2*(q_highのビット) + (q_lowのビット)
+        q_high (int): 4x4行列の上位ビットに対応する量子ビット
+        q_low (int): 4x4行列の下位ビットに対応する量子ビット
+        numQubit (int): 量子ビット数
+        
+    Returns:
+        numpy.ndarray: ゲート適用後の状態ベクトル（state_out）
+    """
+    qa, qb = min(q_high, q_low), max(q_high, q_low)
+    
+    # 2つの対象量子ビットを軸に持つ (a, 2, b, 2, c) のビューに整形
+    a = 1 << qa
+    b = 1 << (qb - qa - 1)
+    c = 1 << (numQubit - qb - 1)
+    sv_in = state_in.reshape(a, 2, b, 2, c)
+    sv_out = state_out.reshape(a, 2, b, 2, c)
     
+    # U[出力上位, 出力下位, 入力上位, 入力下位]
+    U = U4.reshape(2, 2, 2, 2)
+    if q_high == qa:
+        np.einsum('wxyz,aybzc->awbxc', U, sv_in, out=sv_out)
     else:
-        # 単一量子ビットゲートの場合：無条件でゲートを適用
-        for i in range(m):
-            x = i * s
-            ip = i * p
-            
-            for j in range(p):
-                i0 = x + j
-                i1 = i0 + p
-                sv0 = state_vector[i0]
-                sv1 = state_vector[i1]
-                state_vector[i0] = sv0 * t00 + sv1 * t01
-                state_vector[i1] = sv0 * t10 + sv1 * t11
+        np.einsum('wxyz,azbyc->axbwc', U, sv_in, out=sv_out)
+    
+    return state_out
 
-    return state_vector
+
+def apply_2qubit_gate_batch(state, U4_batch):
+    """
+    先頭2量子ビット（量子ビット0, 1）に対する複数の4x4ゲートを一括で適用
+    （NumPy・CuPyどちらの配列でも動作）
+    
+    Args:
+        state (numpy.ndarray): 状態ベクトル（swap_qubits_to_front で対象を先頭に並べ替え済み）
+        U4_batch (numpy.ndarray): 適用するゲートの4x4行列群 [k, 4, 4]
+                                  行・列の添字は 2*(量子ビット0のビット) + (量子ビット1のビット)
+        
+    Returns:
+        numpy.ndarray: ゲートごとの適用後の状態ベクトル群 [k, 4, 2^(numQubit-2)]
+    """
+    return U4_batch @ state.reshape(4, -1)
+
+
+def swap_qubits_to_front(state, q_list, numQubit):
+    """
+    指定した量子ビットが先頭（量子ビット0, 1, ...）に来るよう状態ベクトルを並べ替え
+    
+    Args:
+        state (numpy.ndarray): 多量子ビット状態ベクトル
+        q_list (list): 先頭に移動する量子ビットのインデックス（この順に0, 1, ...となる）
+        numQubit (int): 量子ビット数
+        
+    Returns:
+        numpy.ndarray: 並べ替え後の状態ベクトル（新しい配列）
+    """
+    perm = list(q_list) + [q for q in range(numQubit) if q not in q_list]
+    return state.reshape([2] * numQubit).transpose(perm).reshape(-1)
+
+
+def swap_qubits_from_front(state, q_list, numQubit):
+    """
+    swap_qubits_to_front で並べ替えた状態ベクトルを元の量子ビット順に戻す
+    
+    Args:
+        state (numpy.ndarray): 並べ替え後の状態ベクトル
+        q_list (list): swap_qubits_to_front に渡した量子ビットのインデックス
+        numQubit (int): 量子ビット数
+        
+    Returns:
+        numpy.ndarray: 元の量子ビット順の状態ベクトル（新しい配列）
+    """
+    perm = list(q_list) + [q for q in range(numQubit) if q not in q_list]
+    return state.reshape([2] * numQubit).transpose(np.argsort(perm)).reshape(-1)
 
 
 def partical_trace(state, numQubit):
@@ -197,42 +271,59 @@ def partical_trace(state, numQubit):
     Returns:
         numpy.ndarray: 各量子ビットの2x2密度行列の配列 [numQubit, 2, 2]
     """
-    densityMatrix = np.array([[[0+0j]*2]*2]*numQubit)
-    n = 1 << numQubit
-    
-    # 非対角成分（コヒーレンス項）の計算
+    densityMatrix = np.zeros((numQubit, 2, 2), dtype=np.complex128)
+
+    # 各基底状態の占有確率（abs()による平方根を介さない）を量子ビットごとの軸を持つテンソルに整形
+    probs = (state.real * state.real + state.imag * state.imag).reshape([2] * numQubit)
+    all_axes = tuple(range(numQubit))
+
     for i in range(numQubit):
+        # i番目の量子ビットを中央の軸とする (m, 2, p) のビュー
         m = 1 << i
-        s = n/m
-        p = s/2
-        newDensityMatrix1 = 0+0j
-        
-        for j in range(m):
-            x = j * s
-            ip = j * p
-            for k in range(int(p)):
-                i0 = x + k
-                i1 = i0 + p
-                newDensityMatrix1 += state[int(i0)] * np.conj(state[int(i1)])
-
-        densityMatrix[i, 0, 1] = newDensityMatrix1.copy()
-
-    # 対角成分（占有確率）の計算
-    for j in range(n):
-        newDensityMatrix0 = abs(state[j]) * abs(state[j])
-        for i in range(numQubit):
-            # i番目の量子ビットが|0⟩状態の場合
-            if ((~j >> (numQubit-i-1)) & 1):
-                densityMatrix[i, 0, 0] += newDensityMatrix0.copy()
+        p = 1 << (numQubit - i - 1)
+        sv = state.reshape(m, 2, p)
+
+        # 非対角成分（コヒーレンス項）: Σ ψ0 · conj(ψ1)（vdotは第1引数を共役）
+        densityMatrix[i, 0, 1] = np.vdot(sv[:, 1, :], sv[:, 0, :])
+
+        # 対角成分（占有確率）: i番目以外の軸で総和した周辺確率の|0⟩成分
+        densityMatrix[i, 0, 0] = probs.sum(axis=all_axes[:i] + all_axes[i+1:])[0]
     
     # 密度行列の完成（エルミート性と確率の正規化）
-    for i in range(numQubit):
-        densityMatrix[i, 1, 0] = np.conj(densityMatrix[i, 0, 1]).copy()  # エルミート共役
-        densityMatrix[i, 1, 1] = 1 - abs(densityMatrix[i, 0, 0]).copy()  # |1⟩状態の確率
+    densityMatrix[:, 1, 0] = np.conj(densityMatrix[:, 0, 1])  # エルミート共役
+    densityMatrix[:, 1, 1] = 1 - abs(densityMatrix[:, 0, 0])  # |1⟩状態の確率
 
     return densityMatrix
 
 
+def bloch_radius_sq_two(states):
+    """
+    先頭2量子ビットのブロッホ球半径の2乗を複数の状態について一括計算
+    r² = 4|ρ01|² + (2ρ00 - 1)² を2量子ビットの縮約密度行列から求める
+    （NumPy・CuPyどちらの配列でも動作）
+    
+    Args:
+        states (numpy.ndarray): 先頭2量子ビットを軸に持つ状態ベクトル群 [k, 4, 2^(numQubit-2)]
+                                (apply_2qubit_gate_batch の戻り値)
+        
+    Returns:
+        tuple: (量子ビット0の半径の2乗 [k], 量子ビット1の半径の2乗 [k])
+    """
+    # 2量子ビットの縮約密度行列 ρ[a, b] = Σ ψ_a · conj(ψ_b)（添字は 2*(ビット0) + (ビット1)）
+    rho = states @ states.conj().swapaxes(1, 2)
+    
+    # 量子ビット0: |0⟩側は添字0,1、|1⟩側は添字2,3
+    c1 = rho[:, 0, 2] + rho[:, 1, 3]
+    p1 = (rho[:, 0, 0] + rho[:, 1, 1]).real
+    # 量子ビット1: |0⟩側は添字0,2、|1⟩側は添字1,3
+    c2 = rho[:, 0, 1] + rho[:, 2, 3]
+    p2 = (rho[:, 0, 0] + rho[:, 2, 2]).real
+    
+    r1_sq = 4 * (c1.real**2 + c1.imag**2) + (2*p1 - 1)**2
+    r2_sq = 4 * (c2.real**2 + c2.imag**2) + (2*p2 - 1)**2
+    return r1_sq, r2_sq
+
+
 def CoordinateCalc(densityMatrix):
     """
     密度行列からブロッホ球座標を計算
@@ -310,73 +401,22 @@ def AllCoordinateCalc(densityMatrix):
         coordinates.append(coordinate)
     return coordinates
 
-# 半径値の絶対誤差計算
-def radiusDiff(data1, data2):
+# 三次元空間上の点と点の距離の2乗計算
+def distance_sq(data1, data2):
     """
-    二つの半径値の絶対誤差を計算
-    
-    Args:
-        data1 (float): 半径値1
-        data2 (float): 半径値2
-        
-    Returns:
-        float: 絶対誤差
-    """
-    diff = abs(data1 - data2)
-    return diff
-
-# 三次元空間上の点と点の距離計算
-def distanceDiff(data1, data2):
-    """
-    3次元空間での2点間のユークリッド距離を計算
+    3次元空間での2点間のユークリッド距離の2乗を計算
+    大小比較のみ必要な場合は平方根を取らずにこの値を比較する
     
     Args:
         data1 (list): 点1の座標 [x, y, z]
         data2 (list): 点2の座標 [x, y, z]
         
     Returns:
-        float: 2点間の距離
+        float: 2点間の距離の2乗
     """
-    length = np.sqrt((data1[0] - data2[0])**2 + (data1[1] - data2[1])**2 + (data1[2] - data2[2])**2)
-    return length
+    return (data1[0] - data2[0])**2 + (data1[1] - data2[1])**2 + (data1[2] - data2[2])**2
 
-# 誤差を比較計算
-def diff_compare(min_diff, result_diff):
-    """
-    現在の最小誤差と新しい誤差を比較し、必要に応じて更新
-    
-    Args:
-        min_diff (float): 現在の最小誤差
-        result_diff (float): 新しい誤差
-        
-    Returns:
-        tuple: (更新された最小誤差, 更新されたかのフラグ)
-    """
-    result = False
-    if min_diff - 0.000000000001 > result_diff:  # 数値誤差を考慮した比較
-        min_diff = result_diff
-        result = True
-    return min_diff, result
 
-# 入力ゲート行列作成
-def CreateGateArray(numQubit, targetQubit, controlQubit):
-    """
-    指定された制御・ターゲット関係でゲート配置配列を作成
-    
-    Args:
-        numQubit (int): 量子ビット数
-        targetQubit (int): ターゲット量子ビットのインデックス
-        controlQubit (int): 制御量子ビットのインデックス（-1の場合は制御なし）
-        
-    Returns:
-        list: ゲート配置配列 ['', 'c', 'TG', '', ...]
-    """
-    gate = [''] * numQubit
-    if controlQubit != -1:
-        gate[controlQubit] = "c"  # 制御ビット
-    gate[targetQubit] = "TG"      # ターゲットビット
-    return gate
-            
 def radius_inspect(sorted_data):
     """
     エンタングルメント制約による半径値の妥当性を検査
@@ -589,8 +629,7 @@ def radius_judge(numQubit, target_radius):
         return []  # エンタングルメント不要
 
     # 半径の小さい順に並べ替え（重要度順）
-    sorted_indices = np.argsort([r[1] for r in radius_index])
-    sorted_data = [radius_index[i] for i in sorted_indices]
+    sorted_data = sorted(radius_index, key=lambda r: r[1])
     print(sorted_data)
 
     # エンタングルメント制約の検証
@@ -620,7 +659,12 @@ def mainCalc(json_long, json_short, initialize_state, target_coordinates, target
     gate_array = []
     numQubit = len(target_coordinates)
     calc_order = []
-    result_state = initialize_state
+    result_state = initialize_state.astype(np.complex128)  # 初期状態のコピー（書き換え用）
+
+    # 前半処理で一度に評価する第2ゲートの数（一括評価の状態ベクトル群がSEARCH_BATCH_SIZE振幅以内）
+    batch_size = max(1, SEARCH_BATCH_SIZE >> numQubit)
+    # 前半処理の探索に使う配列モジュール（大規模な場合はGPU）
+    xp = cp if cp is not None and numQubit >= SEARCH_GPU_MIN_QUBITS else np
     
     # エンタングルメント必要性の判定と計算順序決定
     sorted_data = radius_judge(numQubit, target_radius)
@@ -641,7 +685,6 @@ def mainCalc(json_long, json_short, initialize_state, target_coordinates, target
     print("\ntotalCalcStep:", totalCalcStep, "\n")
 
     # 進捗率計算用の係数
-    FirstInsideOneProgress = (FirstInsideStep/totalCalcStep) * 100
     FirstOutsideOneProgress = ((FirstOutsideStep + len(json_short) * FirstInsideStep)/totalCalcStep) * 100
     FirstOneProgress = (FirstStep/totalCalcStep) * 100
     FirstProgress = (len(calc_order) * FirstStep/totalCalcStep) * 100
@@ -655,53 +698,61 @@ def mainCalc(json_long, json_short, initialize_state, target_coordinates, target
     if len(calc_order) != 0:
         print("\n*************************")
         print("前半進捗率:", 0.0, "%")
+
+        short_gates = np.array([data[1] for data in json_short])  # 前半処理用ゲート行列 [N, 2, 2]
         
         for num, order in enumerate(calc_order):
-            min_diff = 2  # 初期最小誤差
+            min_diff_threshold = 2 - SEARCH_TOLERANCE  # 更新の閾値（初期最小誤差 2 - 許容幅、更新時のみ再計算）
             targetQubit_1 = order[0][0]  # 第1ターゲット量子ビット
             targetQubit_2 = order[1][0]  # 第2ターゲット量子ビット
+            target_r1 = order[0][1]      # 第1ターゲット量子ビットの目標半径
+            target_r2 = order[1][1]      # 第2ターゲット量子ビットの目標半径
             
-            # ゲート配置の準備
-            gate_1 = CreateGateArray(numQubit, targetQubit_1, -1)        # 単一ビットゲート1
-            gate_2 = CreateGateArray(numQubit, targetQubit_2, -1)        # 単一ビットゲート2
-            ControlGate = CreateGateArray(numQubit, targetQubit_2, targetQubit_1)  # 制御ゲート
+            # 対象の2量子ビットを先頭（量子ビット0, 1）に並べ替えた状態で探索する
+            # （各振幅ペアが連続したメモリ領域になり、部分トレースもコピー不要）
+            front_qubits = [targetQubit_1, targetQubit_2]
+            work_state = swap_qubits_to_front(result_state, front_qubits, numQubit)
+            search_state = xp.asarray(work_state, dtype=SEARCH_DTYPE)  # 探索用の単精度状態（GPU使用時は転送）
+            search_state[xp.abs(search_state) < SEARCH_FLUSH] = 0  # 確率への寄与が無視できる振幅を切り捨て
             
             # 全ゲート組み合わせの試行（ブルートフォース最適化）
             for index_1, data_1 in enumerate(json_short):
-                # 第1ゲート適用
-                data_1_state = apply_controlled_gate(result_state.copy(), gate_1, data_1[1], numQubit)
-
-                for index_2, data_2 in enumerate(json_short):
-                    # 進捗更新・停止チェック
-                    progress = (FirstOneProgress * num + FirstOutsideOneProgress * index_1 + 
-                              FirstInsideOneProgress * index_2)
-                    if not update_progress_callback(progress):
-                        return False, False
-
-                    # 第2ゲート適用
-                    data_2_state = apply_controlled_gate(data_1_state.copy(), gate_2, data_2[1], numQubit)
-                    # CNOTゲート適用（エンタングルメント生成）
-                    new_state = apply_controlled_gate(data_2_state, ControlGate, X, numQubit)
+                # 進捗更新・停止チェック
+                progress = FirstOneProgress * num + FirstOutsideOneProgress * index_1
+                if not update_progress_callback(progress):
+                    return False, False
+
+                # 第1ゲート・第2ゲート・CNOTゲートを融合した4x4行列を全ての第2ゲートについて計算
+                # CNOT · (U1 ⊗ U2)（上位ビット:targetQubit_1, 下位ビット:targetQubit_2）
+                fused_gates = CNOT @ np.einsum('ab,jcd->jacbd', data_1[1], short_gates).reshape(-1, 4, 4)
+                fused_gates = xp.asarray(fused_gates, dtype=SEARCH_DTYPE)
+
+                for start in range(0, len(json_short), batch_size):
+                    # 融合ゲートを一括適用（第1ゲート→第2ゲート→CNOTゲートと等価）
+                    new_states = apply_2qubit_gate_batch(search_state, fused_gates[start:start + batch_size])
                     
-                    # 結果評価
-                    densityMatrix = partical_trace(new_state, numQubit)
-                    radius = RadiusCalc(densityMatrix, order)
+                    # 結果評価（対象の2量子ビットのみ）と誤差計算
+                    r1_sq, r2_sq = bloch_radius_sq_two(new_states)
+                    result_diffs = (xp.abs(xp.sqrt(r1_sq) - target_r1) + xp.abs(xp.sqrt(r2_sq) - target_r2)) * 0.5
                     
-                    # 誤差計算
-                    result_diffs = []
-                    for i, targetQubit in enumerate(order):
-                        result_diffs.append(radiusDiff(radius[i], targetQubit[1]))
-                    result_diff = (result_diffs[0] + result_diffs[1]) / 2
+                    # 最小誤差から許容幅以内の最初の候補を選ぶ（短いゲート系列を優先）
+                    index = int(xp.flatnonzero(result_diffs <= result_diffs.min() + SEARCH_TOLERANCE)[0])
                     
-                    # 最良結果の更新
-                    min_diff, min_result = diff_compare(min_diff, result_diff)
-                    if min_result:
-                        state = new_state.copy()
+                    # 最良結果の更新（許容幅を超えて改善した場合のみ）
+                    result_diff = float(result_diffs[index])
+                    if min_diff_threshold > result_diff:
+                        min_diff_threshold = result_diff - SEARCH_TOLERANCE
+                        data_2 = json_short[start + index]
+                        best_gate_1 = data_1[1]
+                        best_gate_2 = data_2[1]
                         gate_array_result_1 = [data_1[0], targetQubit_1]
                         gate_array_result_2 = [data_2[0], targetQubit_2]
 
-            # 最良結果を次の状態として採用
-            result_state = state.copy()
+            # 最良のゲートを倍精度で適用し、元の量子ビット順に戻して次の状態として採用
+            best_state = apply_2qubit_gate(
+                work_state, np.empty_like(work_state), CNOT @ np.kron(best_gate_1, best_gate_2), 0, 1, numQubit
+            )
+            np.copyto(result_state, swap_qubits_from_front(best_state, front_qubits, numQubit))
             gate_array_result_3 = [["cnot"], targetQubit_2]
             gate_array.append(gate_array_result_1)
             gate_array.append(gate_array_result_2)
@@ -715,8 +766,13 @@ def mainCalc(json_long, json_short, initialize_state, target_coordinates, target
     print("後半進捗率:", 0.0, "%")
     
     for i in range(numQubit):
-        min_diff = 2  # 初期最小誤差
-        gate = CreateGateArray(numQubit, i, -1)  # i番目の量子ビット用ゲート
+        # 更新の閾値（許容幅は距離に対して適用し、比較用に2乗した値も保持する）
+        min_diff_threshold = 2 - DIFF_TOLERANCE  # 初期最小誤差2 - 許容幅
+        min_diff_sq_threshold = min_diff_threshold**2
+
+        # i番目の量子ビットの密度行列は試行間で不変なため一度だけ計算
+        # （単一ビットゲートUの適用後は U ρ U† で得られる）
+        rho = partical_trace(result_state, numQubit)[i]
         
         # 全ゲートパターンの試行
         for index, data in enumerate(json_long):
@@ -725,22 +781,22 @@ def mainCalc(json_long, json_short, initialize_state, target_coordinates, target
             if not update_progress_callback(progress):
                 return False, False
             
-            # ゲート適用と評価
-            new_state = apply_controlled_gate(result_state.copy(), gate, data[1], numQubit)
-            densityMatrix = partical_trace(new_state, numQubit)
-            new_coordinate = CoordinateCalc(densityMatrix[i])
+            # ゲート適用と評価（状態ベクトル全体には適用しない）
+            U = data[1]
+            new_coordinate = CoordinateCalc(U @ rho @ U.conj().T)
             
-            # 目標座標との距離計算
-            result_diff = distanceDiff(new_coordinate, target_coordinates[i])
+            # 目標座標との距離の2乗計算（比較のみのため平方根は不要）
+            result_diff_sq = distance_sq(new_coordinate, target_coordinates[i])
             
-            # 最良結果の更新
-            min_diff, min_result = diff_compare(min_diff, result_diff)
-            if min_result:
-                state = new_state.copy()
+            # 最良結果の更新（許容幅を超えて改善した場合のみ）
+            if min_diff_sq_threshold > result_diff_sq:
+                min_diff_threshold = math.sqrt(result_diff_sq) - DIFF_TOLERANCE
+                min_diff_sq_threshold = max(min_diff_threshold, 0.0)**2
+                best_gate = U
                 gate_array_result = [data[0], i]
 
-        # 最良結果を次の状態として採用
-        result_state = state.copy()
+        # 最良のゲートのみ状態ベクトルに適用して次の状態とする
+        apply_controlled_gate(result_state, result_state, i, best_gate, numQubit)
         gate_array.append(gate_array_result)
         print("後半進捗率:", (i+1)/numQubit*100, "%")
     
@@ -778,7 +834,7 @@ def resultCalc(result_state, target_coordinates, result):
         phi = np.arctan2(coordinate[1], coordinate[0])  # 方位角
         
         # 精度評価
-        min_diff = distanceDiff(coordinate, target_coordinates[i])  # 目標との距離
+        min_diff = math.sqrt(distance_sq(coordinate, target_coordinates[i]))  # 目標との距離
         accuracy = 1 - min_diff/2  # 精度（0-1の正規化）
 
         # 結果表示
@@ -0,0 +1,45 @@
+# #----------------------------------------------------
+#   Program name : func_2_numba.py
+#   Date of program : 2025/1/22
+#   Author : tomo-ing
+#----------------------------------------------------
+
+"""
+量子ゲート適用のNumba JITカーネル
+func_2.apply_controlled_gate の内側ループをコンパイル済みコードで実行する
+
+主な機能:
+- 2x2ゲート行列の状態ベクトルへの適用
+- 外側ループのスレッド並列化（prange）
+
+Note: numbaが未インストールの場合、func_2はNumPy実装にフォールバックする
+"""
+
+import numpy as np
+from numba import njit, prange
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _apply_2x2(state, t00, t01, t10, t11, m, p):
+    """
+    2x2ゲート行列を状態ベクトルにインプレースで適用
+
+    Args:
+        state (numpy.ndarray): 状態ベクトル（1次元・連続配列、直接書き換える）
+        t00, t01, t10, t11 (complex): ゲート行列の要素
+        m (int): ターゲットビットより上位のブロック数
+        p (int): ターゲットビットのストライド（|0⟩と|1⟩の振幅の間隔）
+    """
+    for i in prange(m):
+        x = i * 2 * p
+        for j in range(p):
+            i0 = x + j
+            i1 = i0 + p
+            a = state[i0]
+            b = state[i1]
+            state[i0] = t00 * a + t01 * b
+            state[i1] = t10 * a + t11 * b
+
+
+# モジュール読み込み時に一度コンパイルしておく（初回呼び出しのJIT待ちを回避）
+_apply_2x2(np.zeros(2, dtype=np.complex128), 1+0j, 0j, 0j, 1+0j, 1, 1)
@@ -15,13 +15,35 @@
 - 並列実行可能な量子回路レイアウトの生成
 """
 
+import collections
+import functools
+import sys
 import numpy as np
 import pyjson
 
+# スケジューリング処理のJITコンパイル（未インストールの場合はPythonで実行）
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
+# 回路レイアウトで扱うゲート名と整数ID（0は空きスロット）
+GATE_NAMES = ("", "H", "T", "S", "X", "Y", "Z", "cnot", "control")
+GATE_ID = {name: gate_id for gate_id, name in enumerate(GATE_NAMES)}
+_GATE_NAME_ARRAY = np.array(GATE_NAMES, dtype=object)  # ゲートID→ゲート名の一括変換用
+_CNOT_ID = GATE_ID["cnot"]
+_X_ID = GATE_ID["X"]
+_CONTROL_ID = GATE_ID["control"]
+
+# 変換対象外の基本ゲート（変換ルール表から除外する）
+BASE_GATES = frozenset({"H", "T"})
+
+
+@functools.lru_cache(maxsize=1)
 def gate_convert_data_read():
     """
     ゲート変換ルールのJSONデータを読み込む
+    ファイルの読み込みは初回のみ（結果はキャッシュされるため書き換えないこと）
     
     Returns:
         dict: ゲート変換ルール辞書
@@ -31,7 +53,9 @@ def gate_convert_data_read():
     with open('gate_convert_2.json', 'r') as f:
         json_data = f.read()
     loaded_data = pyjson.parse_json(json_data)
-    return loaded_data
+    
+    # ゲート名は共有の文字列に置き換える（変換対象の系列と同じ文字列オブジェクトで照合する）
+    return {sys.intern(name): [sys.intern(gate) for gate in sequence] for name, sequence in loaded_data.items()}
 
 
 def sort_gate_length(loaded_data, ACCEPT_GATE):
@@ -44,102 +68,266 @@ def sort_gate_length(loaded_data, ACCEPT_GATE):
         ACCEPT_GATE (list): 使用可能なゲート名リスト
         
     Returns:
-        list: [[ゲート名, 変換系列], ...] の形式でソートされたリスト
+        list: [[ゲート名, 変換系列], ...] の形式でソートされたリスト（基本ゲートのH, Tは含まない）
     """
-    sorted_indices = np.argsort([-len(loaded_data[gate]) for gate in ACCEPT_GATE])
-    sorted_data = [[ACCEPT_GATE[i], loaded_data[ACCEPT_GATE[i]]] for i in sorted_indices]
+    sorted_gates = sorted(ACCEPT_GATE, key=lambda gate: -len(loaded_data[gate]))  # 同じ長さは元の順序を維持
+    sorted_data = [[gate, loaded_data[gate]] for gate in sorted_gates if gate not in BASE_GATES]
     return sorted_data
 
 
-def gate_convert(accept_gate, gate_data, gate_vector):
+@functools.lru_cache(maxsize=32)
+def accept_gate_table(accept_gate):
+    """
+    使用可能ゲートの変換ルール表を作成（使用可能ゲートの組ごとにキャッシュ）
+    
+    Args:
+        accept_gate (tuple): 使用可能なゲート名のタプル
+        
+    Returns:
+        tuple: ((ゲート名, 変換系列, 系列の長さ), ...) を系列の長さの降順に並べた読み取り専用の表
+    """
+    sorted_data = sort_gate_length(gate_convert_data_read(), list(accept_gate))
+    return tuple((name, tuple(sequence), len(sequence)) for name, sequence in sorted_data)
+
+
+@functools.lru_cache(maxsize=32)
+def gate_convert_automaton(accept_gate):
     """
-    ゲート系列を基本ゲートに変換
+    変換ルール表からパターン照合用のAho-Corasickオートマトンを作成
+    （変換ルール表ごとにキャッシュ）
     
     Args:
-        accept_gate (list): 使用可能なゲートと変換ルールのリスト
+        accept_gate (tuple): accept_gate_table で作成した変換ルール表
+        
+    Returns:
+        tuple: (遷移表, 失敗遷移, 出力) のタプル
+               遷移表: 状態ごとの {ゲート名: 次の状態} の辞書のリスト
+               失敗遷移: 状態ごとの照合失敗時の遷移先のリスト
+               出力: 状態ごとの一致したルール [(ゲート名, 系列の長さ), ...] のリスト
+    """
+    goto = [{}]
+    fail = [0]
+    output = [[]]
+    
+    # 変換系列のトライ木を作成
+    for convert_gate0, convert_gate1, convert_gate_length in accept_gate:
+        node = 0
+        for gate in convert_gate1:
+            next_node = goto[node].get(gate)
+            if next_node is None:
+                next_node = len(goto)
+                goto[node][gate] = next_node
+                goto.append({})
+                fail.append(0)
+                output.append([])
+            node = next_node
+        output[node].append((convert_gate0, convert_gate_length))
+    
+    # 幅優先で失敗遷移を設定（深さ1の状態の失敗遷移は根）
+    queue = collections.deque(goto[0].values())
+    while queue:
+        node = queue.popleft()
+        for gate, next_node in goto[node].items():
+            queue.append(next_node)
+            f = fail[node]
+            while f and gate not in goto[f]:
+                f = fail[f]
+            fail[next_node] = goto[f].get(gate, 0)
+            output[next_node] = output[next_node] + output[fail[next_node]]  # 接尾辞で一致するルールも出力
+    
+    return goto, fail, output
+
+
+def gate_convert(automaton, gate_data, gate_vector):
+    """
+    ゲート系列を基本ゲートに変換（入力のゲート系列は書き換えない）
+    Aho-Corasick法で全ルールを1回の走査で照合し、左から最長一致で重ならないように置き換える
+    
+    Args:
+        automaton (tuple): gate_convert_automaton で作成したオートマトン (遷移表, 失敗遷移, 出力)
         gate_data (list): 変換対象のゲート系列
         gate_vector (complex): 位相情報
         
     Returns:
         tuple: (変換後のゲート系列, 更新された位相)
     """
-    for [convert_gate0, convert_gate1] in accept_gate:
-        # H, Tゲート以外を変換対象とする
-        if not (convert_gate0 == 'H' or convert_gate0 == 'T'):
-            convert_gate_length = len(convert_gate1)
-            i = 0
-            
-            # 変換パターンを探索
-            while len(gate_data) >= (convert_gate_length + i):
-                # パターンマッチング
-                if all(gate_data[i+j] == convert_one_gate for j, convert_one_gate in enumerate(convert_gate1)):
-                    # 変換実行
-                    gate_data[i:i+convert_gate_length] = convert_gate0
-                    
-                    # Yゲートの場合は位相調整が必要
-                    if convert_gate0 == 'Y':
-                        gate_vector = gate_vector * (-1j)
-                i += 1
-    return gate_data, gate_vector
+    goto, fail, output = automaton
+    
+    # 変換パターンを探索（開始位置ごとに最長の一致を記録）
+    longest_match = {}
+    node = 0
+    for j, gate in enumerate(gate_data):
+        while node and gate not in goto[node]:
+            node = fail[node]
+        node = goto[node].get(gate, 0)
+        for convert_gate0, convert_gate_length in output[node]:
+            i = j - convert_gate_length + 1
+            if i not in longest_match or longest_match[i][1] < convert_gate_length:
+                longest_match[i] = (convert_gate0, convert_gate_length)
+    
+    if not longest_match:
+        return list(gate_data), gate_vector
+    
+    # 左から順に変換実行（一致の間の区間はスライスでまとめてコピー）
+    result_data = []
+    i = 0
+    for start in sorted(longest_match):
+        if start < i:
+            continue  # 直前の変換と重なる一致は使わない
+        convert_gate0, convert_gate_length = longest_match[start]
+        result_data.extend(gate_data[i:start])
+        result_data.append(convert_gate0)
+        i = start + convert_gate_length
+        
+        # Yゲートの場合は位相調整が必要
+        if convert_gate0 == 'Y':
+            gate_vector = gate_vector * (-1j)
+    result_data.extend(gate_data[i:])
+    return result_data, gate_vector
 
 
-def first_convert_gate(ACCEPT_GATE, loaded_data, input_gate_data):
+def first_convert_gate(ACCEPT_GATE, input_gate_data):
     """
     第一段階変換：複合ゲートを基本ゲートに分解
     
     Args:
         ACCEPT_GATE (list): 使用可能なゲート名リスト
-        loaded_data (dict): ゲート変換ルール
-        input_gate_data (list): 入力ゲートデータ [[ゲート系列, 位相], ...]
+        input_gate_data (list): 入力ゲートデータ [[ゲート系列, 位相], ...]（書き換えない）
         
     Returns:
         list: 変換後のゲートデータ（使用可能ゲートのみを含む）
     """
-    accept_gate = sort_gate_length(loaded_data, ACCEPT_GATE)
+    # オートマトンはゲート系列ごとではなく一度だけ取得する（キャッシュ照会時の変換ルール表のハッシュ計算を避ける）
+    automaton = gate_convert_automaton(accept_gate_table(tuple(ACCEPT_GATE)))
+    accept_set = frozenset(ACCEPT_GATE)
     result_data = []
     
     for [input_gate0, input_gate1] in input_gate_data:
-        convert_gate_data, input_gate1 = gate_convert(accept_gate, input_gate0, input_gate1)
+        convert_gate_data, input_gate1 = gate_convert(automaton, input_gate0, input_gate1)
         
         # 全てのゲートが使用可能ゲートに含まれるかチェック
-        if all(gate in ACCEPT_GATE for gate in convert_gate_data):
+        if all(gate in accept_set for gate in convert_gate_data):
             result_data.append([convert_gate_data, input_gate1])
     
     return result_data
 
 
-def func_cnot_convert(numQubit, data_list, targetBit, result_gate, input_data, i):
+def _schedule(data_list, lengths, is_cnot, target_bits, gates_flat, offsets, result_grid, placed_list, cnot_mask):
     """
-    CNOTゲートの制御・ターゲット関係を処理
+    ゲート系列をタイムステップごとの配置に割り当てるスケジューリング処理
+    （numbaがインストールされている場合はNumPy配列でJITコンパイルして実行し、
+      未インストールの場合はPythonのリストで実行する。どちらの型でも動くよう添字アクセスのみを使う）
     
     Args:
-        numQubit (int): 量子ビット数
-        data_list (list): 各ゲート系列の処理位置
-        targetBit (int): ターゲットビット位置
-        result_gate (list): 現在のゲート配置
-        input_data (list): 入力ゲートデータ
-        i (int): 現在処理中のゲート系列インデックス
+        data_list (list | numpy.ndarray): 各ゲート系列の処理位置（直接書き換える）
+        lengths (list | numpy.ndarray): 各ゲート系列の長さ
+        is_cnot (list | numpy.ndarray): 各ゲート系列がCNOTゲートかどうか
+        target_bits (list | numpy.ndarray): 各ゲート系列のターゲットビット位置
+        gates_flat (list | numpy.ndarray): 全ゲート系列のゲートIDを連結した配列
+        offsets (list | numpy.ndarray): 各ゲート系列の gates_flat 内の開始位置
+        result_grid (list | numpy.ndarray): ゲート配置の書き込み先 [ステップ数の上限][量子ビット数]（0で初期化済み）
+        placed_list (list | numpy.ndarray): 作業用（1ステップで配置したゲート系列の番号、長さは量子ビット数以上）
+        cnot_mask (list | numpy.ndarray): 作業用（CNOTゲートの排他制御、長さは量子ビット数）
         
     Returns:
-        tuple: (配置成功フラグ, 更新されたゲート配置, 制御ビット位置)
+        int: 使用したステップ数
     """
-    # 制御ビットを特定（ターゲットビット以外のビット）
-    control = input_data[i-2][1] if targetBit == input_data[i-1][1] else input_data[i-1][1]
+    num_sequence = len(lengths)
+    numQubit = len(cnot_mask)
+    n_steps = 0
     
-    # 両方のゲート系列が処理可能かチェック
-    if len(input_data[i-2][0]) <= data_list[i-2] and len(input_data[i-1][0]) <= data_list[i-1]:
-        result_gate = [""] * numQubit
-        result_gate[targetBit] = "X"       # ターゲットビットにXゲート
-        result_gate[control] = "control"    # 制御ビットに制御信号
-        return True, result_gate, control
-    else:
-        return False, result_gate, control
+    # 未配置のゲート数（0になれば全てのゲート系列が処理完了）
+    remaining = 0
+    for i in range(num_sequence):
+        if data_list[i] < lengths[i]:
+            remaining += lengths[i] - data_list[i]
+    
+    while remaining > 0:
+        # JIT実行時は範囲外書き込みが検出されないため明示的に確認する
+        if n_steps >= len(result_grid):
+            raise ValueError("タイムステップ数がゲート配置の上限を超えました")
+        result_gate = result_grid[n_steps]  # 現在のタイムステップでのゲート配置（0:空き）
+        for q in range(numQubit):
+            cnot_mask[q] = False
+        placed = 0  # このステップで配置したゲート数（placed_list の有効な長さ）
+        
+        for i in range(num_sequence):
+            if data_list[i] < lengths[i]:
+                targetBit = target_bits[i]
+                
+                # CNOTゲートの処理
+                if is_cnot[i]:
+                    # 制御ビットを特定（直前2つのゲート系列のうちターゲットビット以外のビット）
+                    control = target_bits[i-2] if targetBit == target_bits[i-1] else target_bits[i-1]
+                    cnot_mask[targetBit] = True  # ターゲットビットをマスク
+                    cnot_mask[control] = True    # 制御ビットをマスク
+                    
+                    # 直前2つのゲート系列が処理完了していればCNOTゲートのみのステップとする
+                    if lengths[i-2] <= data_list[i-2] and lengths[i-1] <= data_list[i-1]:
+                        for q in range(numQubit):
+                            result_gate[q] = 0
+                        result_gate[targetBit] = _X_ID          # ターゲットビットにXゲート
+                        result_gate[control] = _CONTROL_ID      # 制御ビットに制御信号
+                        placed_list[0] = i
+                        placed = 1
+                        break
+
+                # 単一量子ビットゲートの処理
+                elif result_gate[targetBit] == 0 and not cnot_mask[targetBit]:
+                    result_gate[targetBit] = gates_flat[offsets[i] + data_list[i]]
+                    placed_list[placed] = i
+                    placed += 1
+                    
+                    # 全ビットにゲートが配置されたら次のタイムステップへ
+                    # （単一量子ビットゲートは空きビットにのみ配置するため配置数で判定できる）
+                    if placed == numQubit:
+                        break
+
+        # 1ゲートも配置できないステップは不正なゲート系列（例：制御ビットとターゲットビットが同じCNOT）
+        if placed == 0:
+            raise ValueError("ゲートを配置できないタイムステップがあります")
+        for k in range(placed):
+            data_list[placed_list[k]] += 1
+        remaining -= placed
+        n_steps += 1
+
+    return n_steps
+
+
+if njit is not None:
+    _schedule = njit(cache=True)(_schedule)
+
+
+def encode_gate_sequences(gate_array):
+    """
+    ゲート系列のリストを整数IDの配列群（系列ごとの属性を並べた形式）に変換
+    
+    Args:
+        gate_array (list): ゲート系列データ [[ゲート系列, ターゲットビット], ...]
+        
+    Returns:
+        tuple: (target_bits, lengths, gates_flat, offsets)
+               target_bits: 各ゲート系列のターゲットビット位置 [int8]
+               lengths: 各ゲート系列の長さ [int32]
+               gates_flat: 全ゲート系列のゲートIDを連結した配列 [int8]
+               offsets: 各ゲート系列の gates_flat 内の開始位置 [int32]
+    """
+    num_sequence = len(gate_array)
+    target_bits = np.fromiter((gate_data[1] for gate_data in gate_array), dtype=np.int8, count=num_sequence)
+    lengths = np.fromiter((len(gate_data[0]) for gate_data in gate_array), dtype=np.int32, count=num_sequence)
+    gates_flat = np.fromiter(
+        (GATE_ID[gate] for gate_data in gate_array for gate in gate_data[0]), dtype=np.int8, count=int(lengths.sum())
+    )
+    offsets = np.zeros(num_sequence, dtype=np.int32)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    return target_bits, lengths, gates_flat, offsets
 
 
 def second_convert_gate(numQubit, first_converted_gate):
     """
     第二段階変換：実際の量子回路レイアウトに変換
     複数の量子ビットに対するゲートを並列実行可能な形式に整理
+    （encode_gate_sequences で整数IDの配列群に変換して _schedule で処理し、最後にゲート名に戻す）
     
     Args:
         numQubit (int): 量子ビット数
@@ -148,46 +336,29 @@ def second_convert_gate(numQubit, first_converted_gate):
     Returns:
         list: 量子回路レイアウト [[ビット0のゲート, ビット1のゲート, ...], ...]
     """
-    data_list = [0] * len(first_converted_gate)  # 各ゲート系列の処理位置
-    final_result_gate = []
+    target_bits, lengths, gates_flat, offsets = encode_gate_sequences(first_converted_gate)
     
-    while True:
-        # 全てのゲート系列が処理完了かチェック
-        if all(data_list[i] >= len(gate_data[0]) for i, gate_data in enumerate(first_converted_gate)):
-            break
-
-        result_gate = [""] * numQubit           # 現在のタイムステップでのゲート配置
-        add_data_list = [0] * len(first_converted_gate)  # 処理位置の更新量
-        cnot_mask = [0] * numQubit              # CNOTゲートの排他制御
-        
-        for i, gate_data in enumerate(first_converted_gate):
-            if data_list[i] < len(gate_data[0]):
-                
-                # CNOTゲートの処理
-                if gate_data[0][0] == "cnot":
-                    TF, result_gate, control_bit = func_cnot_convert(
-                        numQubit, data_list, gate_data[1], result_gate, first_converted_gate, i
-                    )
-                    cnot_mask[gate_data[1]] = 1      # ターゲットビットをマスク
-                    cnot_mask[control_bit] = 1       # 制御ビットをマスク
-                    
-                    if TF:
-                        add_data_list = [0] * len(first_converted_gate)
-                        add_data_list[i] = 1
-                        break
-                    else:
-                        continue
-
-                # 単一量子ビットゲートの処理
-                elif result_gate[gate_data[1]] == "" and cnot_mask[gate_data[1]] == 0:
-                    result_gate[gate_data[1]] = gate_data[0][data_list[i]]
-                    add_data_list[i] = 1
-                    
-                    # 全ビットにゲートが配置されたら次のタイムステップへ
-                    if all(result_one_gate != "" for result_one_gate in result_gate):
-                        break
-
-        final_result_gate.append(result_gate)
-        data_list = [a + b for a, b in zip(data_list, add_data_list)]
-
-    return final_result_gate
+    # 先頭のゲートがCNOTゲートの系列（ステップごとの文字列比較の代わりに一度だけ判定）
+    is_cnot = np.zeros(len(lengths), dtype=np.bool_)
+    nonempty = lengths > 0
+    is_cnot[nonempty] = gates_flat[offsets[nonempty]] == _CNOT_ID
+    
+    # 各ステップで少なくとも1ゲートは配置されるため、ステップ数は総ゲート数以下
+    upper_bound = int(lengths.sum())
+    if njit is not None:
+        data_list = np.zeros(len(lengths), dtype=np.int32)  # 各ゲート系列の処理位置
+        result_grid = np.zeros((upper_bound, numQubit), dtype=np.int8)
+        n_steps = _schedule(
+            data_list, lengths, is_cnot, target_bits, gates_flat, offsets,
+            result_grid, np.zeros(numQubit, dtype=np.int32), np.zeros(numQubit, dtype=np.bool_)
+        )
+        # ゲートIDをゲート名に戻す（最後に一度だけ一括変換）
+        return _GATE_NAME_ARRAY[result_grid[:n_steps]].tolist()
+    
+    # numba未使用時はPythonのリストで実行（インタプリタではNumPy配列の要素アクセスの方が遅いため）
+    result_grid = [[0] * numQubit for _ in range(upper_bound)]
+    n_steps = _schedule(
+        [0] * len(lengths), lengths.tolist(), is_cnot.tolist(), target_bits.tolist(), gates_flat.tolist(),
+        offsets.tolist(), result_grid, [0] * numQubit, [False] * numQubit
+    )
+    return [[GATE_NAMES[gate] for gate in result_gate] for result_gate in result_grid[:n_steps]]
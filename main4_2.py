@@ -16,15 +16,23 @@
 5. 結果の評価・出力
 """
 
-import numpy as np
 import func_2 as func
 import gate_convert_2 as gc
+import functools
 import time
-import copy
 
-# 事前計算済みデータの読み込み
-json_data = func.data_read()
-convert_gate_data = gc.gate_convert_data_read()
+
+@functools.lru_cache(maxsize=None)
+def load_gate_data():
+    """
+    事前計算済みデータの読み込み（初回呼び出し時のみ読み込み、以降は同じデータを返す）
+    モジュール読み込み時に読み込まないのは、計算を行わないプロセス（Webサーバー本体）で
+    データを保持しないため
+    
+    Returns:
+        list: ゲートデータ [[ゲート系列, ユニタリ行列], ...]（読み取り専用として扱う）
+    """
+    return func.data_read()
 
 
 def gateConverter(max_short_gate_length, max_long_gate_length, acceptGate):
@@ -46,16 +54,12 @@ def gateConverter(max_short_gate_length, max_long_gate_length, acceptGate):
     # 変換可能ゲートの設定（例:["H","T","S","X","Y","Z"]）
     ACCEPT_GATE = acceptGate
 
-    # データのディープコピー（元データを保護）
-    INPUT_DATA = copy.deepcopy(json_data)
-    CONVERT_GATE_DATA = copy.deepcopy(convert_gate_data)
-
     # 第一段階変換：複合ゲートを基本ゲートに分解
-    first_converted_gate = gc.first_convert_gate(ACCEPT_GATE, CONVERT_GATE_DATA, INPUT_DATA)
+    # （変換は元データを書き換えないため、ディープコピーは不要）
+    first_converted_gate = gc.first_convert_gate(ACCEPT_GATE, load_gate_data())
 
     # ゲート長でソート（短い系列から処理）
-    sorted_indices = np.argsort([len(data[0]) for data in first_converted_gate])
-    sorted_data = [first_converted_gate[i] for i in sorted_indices]
+    sorted_data = sorted(first_converted_gate, key=lambda data: len(data[0]))  # 同じ長さは元の順序を維持
 
     # ゲート長でデータを分類
     data_long = func.data_sort(sorted_data, MAX_LONG_GATE_LENGTH)
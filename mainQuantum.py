@@ -21,9 +21,12 @@ os.environ['GEVENT_SUPPORT'] = 'True'
 from flask import Flask, render_template, request, jsonify, session, send_from_directory, Response
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit, join_room, leave_room
+import functools
+import multiprocessing
 import time
 import threading
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 import main4_2 as getCircuit
 
 app = Flask(__name__)
@@ -37,84 +40,282 @@ CORS(app)  # 全てのエンドポイントでCORSを有効にする
 # WebSocketによるリアルタイム通信設定
 socketio = SocketIO(app)
 
-# ======= ユーザー管理・スレッド管理のグローバル変数 =======
-# ユーザーごとのスレッドオブジェクトを保存
-user_threads = {}
+class UserState:
+    """
+    ユーザーごとの値をスレッド間で安全に保持する辞書
+    一定時間更新・参照されなかった値は expire で破棄する（接続の切れたユーザーの値が残り続けないように）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}  # user_id -> (値, 最終アクセス時刻（time.monotonic）)
+
+    def get(self, user_id, default=None):
+        """
+        値を取得（最終アクセス時刻を更新）
+        
+        Args:
+            user_id (str): ユーザー識別子
+            default: 値がない場合の戻り値
+            
+        Returns:
+            保存されている値 または default
+        """
+        with self._lock:
+            if user_id not in self._data:
+                return default
+            value = self._data[user_id][0]
+            self._data[user_id] = (value, time.monotonic())
+            return value
+
+    def set(self, user_id, value):
+        """
+        値を保存
+        
+        Args:
+            user_id (str): ユーザー識別子
+            value: 保存する値
+        """
+        with self._lock:
+            self._data[user_id] = (value, time.monotonic())
+
+    def pop(self, user_id, default=None):
+        """
+        値を取得して削除
+        
+        Args:
+            user_id (str): ユーザー識別子
+            default: 値がない場合の戻り値
+            
+        Returns:
+            保存されていた値 または default
+        """
+        with self._lock:
+            if user_id not in self._data:
+                return default
+            return self._data.pop(user_id)[0]
+
+    def users_where(self, predicate):
+        """
+        値が条件を満たすユーザーを取得（最終アクセス時刻は更新しない）
+        
+        Args:
+            predicate (callable): 値を受け取り真偽値を返す関数
+            
+        Returns:
+            set: 条件を満たすユーザー識別子の集合
+        """
+        with self._lock:
+            return {user_id for user_id, (value, _) in self._data.items() if predicate(value)}
+
+    def expire(self, older_than=3600, keep=()):
+        """
+        一定時間アクセスのない値を破棄
+        
+        Args:
+            older_than (float): 破棄するまでの時間（秒）
+            keep (set): 時間に関係なく破棄しないユーザー識別子
+        """
+        limit = time.monotonic() - older_than
+        with self._lock:
+            for user_id in [user_id for user_id, (_, accessed) in self._data.items() if accessed < limit]:
+                if user_id not in keep:
+                    del self._data[user_id]
 
-# スレッド停止フラグ - ユーザーごとに計算の停止を制御
-thread_stop_flags = {}
 
-# 計算結果をユーザーごとに保存するグローバル辞書
-calculation_results = {}
+# ======= ユーザー管理・プロセス管理のグローバル変数 =======
+# ユーザーごとの計算タスク（concurrent.futures.Future）を保存
+user_futures = UserState()
+
+# 計算実行イベント - ユーザーごとに計算の停止を制御（計算プロセスと共有）
+# （セット:停止要求なし, クリア:前回の計算に停止を要求中）
+thread_run_events = UserState()
+
+# 計算結果をユーザーごとに保存
+calculation_results = UserState()
 
 # ユーザーごとの進捗状態を保存（0-100の値）
-user_progress = {}  
+user_progress = UserState()
+
+# ユーザーごとの値の保持時間（秒）と破棄処理の間隔（秒）
+USER_STATE_TTL = 3600
+USER_STATE_EXPIRE_INTERVAL = 600
+
+# 計算用プロセスプールとプロセス間の共有オブジェクト（初回の計算要求時に作成）
+executor = None        # 計算を実行するプロセスプール
+manager = None         # 停止イベント・進捗キューを共有するマネージャー
+progress_queue = None  # 計算プロセスからの進捗通知 (user_id, page, progress)
+executor_lock = threading.Lock()
+
+# 計算プロセス数の上限（各プロセスが事前計算済みゲートデータ（約50MB）を保持するため）
+MAX_CALC_WORKERS = 4
+
+# 計算プロセスで停止要求を確認する間隔（秒、確認はプロセス間通信を伴うため間引く）
+STOP_CHECK_INTERVAL = 0.1
 
-# ユーザーごとの進捗更新タイミング制御（最後に送信した時刻を保存）
-user_state = {}
 
+def get_executor():
+    """
+    計算用プロセスプールを取得（初回呼び出し時に作成し、進捗中継・ユーザー状態破棄のスレッドを開始）
+    
+    Returns:
+        ProcessPoolExecutor: 計算用プロセスプール
+    
+    Note:
+        子プロセスはspawn方式で作成する（Numbaの並列スレッドを起動済みのプロセスを
+        forkすると子プロセスが終了できなくなるため）
+        モジュール読み込み時に作成しないのは、子プロセスがこのモジュールを
+        再読み込みした際にプロセスを再帰的に作成しないため
+    """
+    global executor, manager, progress_queue
+    with executor_lock:
+        if executor is None:
+            context = multiprocessing.get_context('spawn')
+            manager = context.Manager()
+            progress_queue = manager.Queue()
+            executor = ProcessPoolExecutor(
+                max_workers=min(os.cpu_count() or 1, MAX_CALC_WORKERS), mp_context=context
+            )
+            relay = threading.Thread(target=relay_progress, args=(progress_queue,))
+            relay.daemon = True  # メインプロセス終了時に自動終了
+            relay.start()
+            expire = threading.Thread(target=expire_user_state)
+            expire.daemon = True
+            expire.start()
+    return executor
 
-def waitForCompletion(user_id):
+
+def expire_user_state():
+    """
+    一定時間アクセスのないユーザーの状態を定期的に破棄する関数（常駐スレッド）
+    計算中のユーザーの状態は破棄しない（停止イベントを失うと停止要求を送れなくなるため）
+    """
+    while True:
+        time.sleep(USER_STATE_EXPIRE_INTERVAL)
+        running = user_futures.users_where(lambda future: not future.done())
+        for state in (user_futures, thread_run_events, calculation_results, user_progress):
+            state.expire(older_than=USER_STATE_TTL, keep=running)
+
+
+def relay_progress(queue):
     """
-    スレッドの完了を待機する関数
+    計算プロセスからの進捗通知をクライアントへ中継する関数（常駐スレッド）
     
     Args:
-        user_id (str): ユーザー識別子
+        queue: 進捗通知キュー（要素は (user_id, page, progress)）
+    """
+    while True:
+        try:
+            user_id, page, progress = queue.get()
+        except (EOFError, OSError):  # 終了時にマネージャーが停止した場合
+            return
+        user_progress.set(user_id, progress)
+        socketio.emit(
+            'progress_update',
+            {'progress': 100 if (progress > 100) else progress, 'page': page},
+            room=user_id
+        )
+
+
+def waitForCompletion(run_event):
+    """
+    前回の計算の停止完了を待機する関数
+    
+    Args:
+        run_event: ユーザーの計算実行イベント（thread_run_events のユーザーの値）
     
     Returns:
         bool: True=正常完了, False=タイムアウト
     
     Note:
-        0.1秒間隔でthread_stop_flags[user_id]をチェック
-        1000回(100秒)でタイムアウト
+        run_eventがセットされる（停止要求が処理される）まで待機
+        100秒でタイムアウト
     """
-    count = 0
-    while thread_stop_flags[user_id]: # スレッド停止フラグが立っている間は待機
-        if count >= 1e+3:  # タイムアウト制限
-            return False
-        time.sleep(0.1)  # 0.1秒待機
-        count += 1
-    return True
-
-def gate_geration_task(user_id, data, gateLength, acceptGate, update_progress_callback):
+    return run_event.wait(timeout=100)
+
+def gate_geration_task(user_id, page, data, gateLength, acceptGate, run_event, progress_queue):
     """
-    量子回路生成の長時間処理を実行する関数
+    量子回路生成の長時間処理を実行する関数（計算プロセスで実行）
     
     Args:
         user_id (str): ユーザー識別子
+        page (str): ページ識別子（進捗通知の送信先）
         data (dict): 入力データ（量子状態や初期条件）
         gateLength (int): 生成する回路の最大ゲート数
         acceptGate (list): 使用可能なゲートの種類
-        update_progress_callback (callable): 進捗更新用のコールバック関数
+        run_event: ユーザーの計算実行イベント（停止要求の確認用）
+        progress_queue: 進捗通知キュー
+    
+    Returns:
+        tuple: (停止完了の待機に成功したか, 生成結果)
     
     Note:
-        - 別スレッドで実行される重い処理
-        - 計算結果はcalculation_results[user_id]に保存
-        - エラー発生時はエラー情報を保存
+        - プロセスプールで実行される重い処理（ユーザー間でGILを共有しない）
+        - 結果の保存と完了時の進捗送信は finish_task で行う
     """
-    try:
-        update_progress_callback(0.0)  # 処理開始
+    last_emit = [float('-inf')]   # 最後に進捗を送信した時刻（time.monotonic）
+    last_check = [float('-inf')]  # 最後に停止要求を確認した時刻
+
+    def update_progress(progress):
+        """
+        進捗更新コールバック関数
         
-        # スレッド停止フラグの待機
-        if waitForCompletion(user_id):
-            # メインの量子回路生成処理を実行
-            result = getCircuit.start(data, gateLength, acceptGate, update_progress_callback=update_progress_callback)
-            calculation_results[user_id] = result  # 結果を保存
-            user_state[user_id]["start"] = 0
+        Args:
+            progress (float): 進捗率（0-100）
             
-            # 処理完了時の進捗設定
-            if not result:
-                progress = 0
-            else:
-                progress = 100
-            update_progress_callback(progress)
-        else:
-            # タイムアウトまたは停止された場合
-            calculation_results[user_id] = False
-            user_state[user_id]["start"] = 0
-            update_progress_callback(100)
+        Returns:
+            bool: 処理続行可否（False=停止）
+        """
+        now = time.monotonic()
+        
+        # 停止要求をチェック（処理したら待機中の計算を再開させる）
+        if now - last_check[0] >= STOP_CHECK_INTERVAL:
+            last_check[0] = now
+            if not run_event.is_set():
+                print(f"Thread for user {user_id} stopped.")
+                run_event.set()
+                return False
+        
+        # 前回更新から3秒以上経過していたら送信（帯域制限）
+        if now - last_emit[0] >= 3:
+            last_emit[0] = now
+            progress_queue.put((user_id, page, progress))
+        return True
+
+    update_progress(0.0)  # 処理開始
+    
+    # 前回の計算の停止を待機
+    if waitForCompletion(run_event):
+        # メインの量子回路生成処理を実行
+        return True, getCircuit.start(data, gateLength, acceptGate, update_progress_callback=update_progress)
+    # タイムアウトまたは停止された場合
+    return False, False
+
+
+def finish_task(user_id, page, future):
+    """
+    計算タスク完了時の処理（結果の保存と完了時の進捗送信）
+    
+    Args:
+        user_id (str): ユーザー識別子
+        page (str): ページ識別子
+        future (Future): 完了した計算タスク
+    """
+    try:
+        completed, result = future.result()
     except Exception as e:
-        calculation_results[user_id] = {"error": str(e)}  # エラーを保存
+        calculation_results.set(user_id, {"error": str(e)})  # エラーを保存
+        return
+    
+    calculation_results.set(user_id, result)  # 結果を保存
+    
+    # 処理完了時の進捗設定（タイムアウト・停止時は100）
+    if completed and not result:
+        progress = 0
+    else:
+        progress = 100
+    user_progress.set(user_id, progress)
+    socketio.emit('progress_update', {'progress': progress, 'page': page}, room=user_id)
 
 
 @app.route('/static/cpp/qcal.wasm')
@@ -180,55 +381,30 @@ def get_vector():
         print("not page")
         return jsonify({"error": "Invalid page"}), 400
     
-    # 前回のスレッドを停止
-    if user_id in thread_stop_flags:
-        thread_stop_flags[user_id] = True
+    pool = get_executor()
+    
+    # 前回の計算を停止
+    run_event = thread_run_events.get(user_id)
+    if run_event is not None:
+        run_event.clear()
     else:
-        thread_stop_flags[user_id] = False  # 新しいスレッド用にリセット
+        run_event = manager.Event()  # 新しいユーザー用に作成（計算プロセスと共有）
+        run_event.set()
+        thread_run_events.set(user_id, run_event)
 
     # ユーザーごとの状態初期化
-    user_progress[user_id] = 0
-    user_state[user_id] = {"start": 0}
-
-    def update_progress(progress):
-        """
-        進捗更新コールバック関数
-        
-        Args:
-            progress (float): 進捗率（0-100）
-            
-        Returns:
-            bool: 処理続行可否（False=停止）
-        """
-        # スレッド停止フラグをチェック
-        if thread_stop_flags.get(user_id, False):
-            print(f"Thread for user {user_id} stopped.")
-            thread_stop_flags[user_id] = False
-            return False
-            
-        user_progress[user_id] = progress
-        end = time.time()
-        
-        # 前回更新から3秒以上経過していたら送信（帯域制限）
-        if (end - user_state[user_id]["start"] >= 3):
-            user_state[user_id]["start"] = end
-            socketio.emit(
-                'progress_update',
-                {'progress': 100 if (progress > 100) else progress, 'page': data['page']},
-                room=user_id
-            )
-        return True
+    user_progress.set(user_id, 0)
 
-    # 非同期計算スレッドを開始
-    thread = threading.Thread(
-        target=gate_geration_task, 
-        args=(user_id, data['data'], data['gateLength'], data['acceptGate'], update_progress)
+    # 計算プロセスで非同期に実行
+    future = pool.submit(
+        gate_geration_task,
+        user_id, data['page'], data['data'], data['gateLength'], data['acceptGate'],
+        run_event, progress_queue
     )
-    thread.daemon = True  # メインプロセス終了時に自動終了
-    thread.start()
+    future.add_done_callback(functools.partial(finish_task, user_id, data['page']))
 
-    # スレッド管理に登録
-    user_threads[user_id] = thread
+    # タスク管理に登録
+    user_futures.set(user_id, future)
 
     return jsonify({"message": "Calculation started", "user_id": user_id}), 200
     
@@ -245,10 +421,11 @@ def get_result():
     if not user_id:
         return jsonify({"error": "No user ID found"}), 400
 
-    if user_id not in calculation_results:
+    missing = object()
+    result = calculation_results.pop(user_id, missing)  # 結果を取得して削除
+    if result is missing:
         return jsonify({"error": "No calculation in progress for this user."}), 400
 
-    result = calculation_results.pop(user_id)  # 結果を取得して削除
     if not result:
         return jsonify({"message": "result none"}), 400  # エラー時
     if isinstance(result, str):
@@ -283,8 +460,9 @@ def handle_disconnect():
         print(f"User {user_id} disconnected.")
 
         # 実行中のスレッドがあれば停止
-        if user_id in thread_stop_flags:
-            thread_stop_flags[user_id] = True  # スレッド停止フラグをセット
+        run_event = thread_run_events.get(user_id)
+        if run_event is not None:
+            run_event.clear()  # 停止を要求
             print(f"Disconnecting user {user_id}. Stopping associated thread.")
 
 if __name__ == '__main__':